@@ -1,7 +1,9 @@
 import datetime
+import functools
 import uuid
 
-from django.test import TestCase
+from django.conf import settings
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 from django.utils import timezone
 from django.contrib.auth.models import User
@@ -9,247 +11,257 @@ from django.contrib.auth.models import Permission
 
 from catalog.models import Author, Book, BookInstance, Genre, Language
 
+FAST_PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+INVALID_BOOK_INSTANCE_PK = uuid.UUID('00000000-0000-0000-0000-000000000001')
 
-class AuthorListViewTest(TestCase):
+AUTHORS_URL = reverse('authors')
+MY_BORROWED_URL = reverse('my-borrowed')
+ALL_BORROWED_URL = reverse('all-borrowed')
+AUTHOR_CREATE_URL = reverse('author-create')
 
-    @classmethod
-    def setUpTestData(cls):
-        number_of_authors = 13
 
-        for author_id in range(number_of_authors):
-            Author.objects.create(first_name=f'Popescu {author_id}',
-                                  last_name=f'Ion {author_id}',
-                                  date_of_birth=datetime.date.today() - datetime.timedelta(weeks=author_id))
+@functools.lru_cache(maxsize=None)
+def _renew_url(pk):
+    return reverse('renew-book-librarian', kwargs={'pk': pk})
 
-    def test_view_url_exists_at_desired_location(self):
-        response = self.client.get('/catalog/authors/')
-        self.assertEqual(response.status_code, 200)
 
-    def test_view_url_accessible_by_name(self):
-        response = self.client.get(reverse('authors'))
-        self.assertEqual(response.status_code, 200)
+class AuthorListViewTest(TestCase):
 
-    def test_view_uses_correct_template(self):
-        response = self.client.get(reverse('authors'))
-        self.assertEqual(response.status_code, 200)
-        self.assertTemplateUsed(response, 'authors.html')
+    @classmethod
+    def setUpTestData(cls):
+        number_of_authors = 13
+        today = datetime.date.today()
+
+        Author.objects.bulk_create([
+            Author(first_name=f'Popescu {author_id}',
+                   last_name=f'Ion {author_id}',
+                   date_of_birth=today - datetime.timedelta(weeks=author_id))
+            for author_id in range(number_of_authors)
+        ])
+
+    def test_author_list_view(self):
+        response = self.client.get(AUTHORS_URL)
+        with self.subTest(check='url accessible by name'):
+            self.assertEqual(response.status_code, 200)
+        with self.subTest(check='uses correct template'):
+            self.assertTemplateUsed(response, 'authors.html')
+        with self.subTest(check='url exists at desired location'):
+            self.assertEqual(AUTHORS_URL, '/catalog/authors/')
 
     def test_pagination_is_ten(self):
-        response = self.client.get(reverse('authors'))
+        response = self.client.get(AUTHORS_URL)
+        ctx = response.context
         self.assertEqual(response.status_code, 200)
-        self.assertTrue('is_paginated' in response.context)
-        self.assertTrue(response.context['is_paginated'] is True)
-        self.assertTrue(len(response.context['author_list']) == 10)
+        self.assertIn('is_paginated', ctx)
+        self.assertIs(ctx['is_paginated'], True)
+        self.assertEqual(len(ctx['author_list']), 10)
 
     def test_list_all_authors(self):
-        response = self.client.get(reverse('authors')+'?page=2')
+        response = self.client.get(AUTHORS_URL+'?page=2')
+        ctx = response.context
         self.assertEqual(response.status_code, 200)
-        self.assertTrue('is_paginated' in response.context)
-        self.assertTrue(response.context['is_paginated'] is True)
-        self.assertTrue(len(response.context['author_list']) == 3)
+        self.assertIn('is_paginated', ctx)
+        self.assertIs(ctx['is_paginated'], True)
+        self.assertEqual(len(ctx['author_list']), 3)
 
 
-class LoanedBookInstanceByUserListViewTest(TestCase):
+class _CatalogFixtureMixin(TestCase):
 
-    def setUp(self):
-        test_user1 = User.objects.create_user(username='testuser1', password='!q@w#e$r%t')
-        test_user2 = User.objects.create_user(username='testuser2', password='!q@w#e$r%t')
-        test_user1.save()
-        test_user2.save()
-        test_author = Author.objects.create(first_name='John', last_name='Smith', date_of_birth=datetime.date.today())
-        test_genre = Genre.objects.create(name='Fantasy')
-        test_language = Language.objects.create(name='English')
-        test_book = Book.objects.create(
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = Author.objects.create(first_name='John', last_name='Smith', date_of_birth=datetime.date.today())
+        cls.genre = Genre.objects.create(name='Fantasy')
+        cls.language = Language.objects.create(name='English')
+        cls.book = Book.objects.create(
             title='Test Book',
             summary='My book summary',
             isbn='asdfg',
-            author=test_author,
-            language=test_language)
-        genre_objects_for_book = Genre.objects.all()
-        test_book.genre.set(genre_objects_for_book)
-        test_book.save()
+            author=cls.author,
+            language=cls.language)
+        cls.book.genre.add(cls.genre)
+
+
+@override_settings(PASSWORD_HASHERS=FAST_PASSWORD_HASHERS)
+class LoanedBookInstanceByUserListViewTest(_CatalogFixtureMixin):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        test_user1 = User.objects.create_user(username='testuser1', password='!q@w#e$r%t')
+        test_user2 = User.objects.create_user(username='testuser2', password='!q@w#e$r%t')
 
         number_of_book_copies = 30
+        now = timezone.localtime()
 
-        for book_copy in range(number_of_book_copies):
-            return_date = timezone.localtime() + datetime.timedelta(days=book_copy % 5)
-            the_borrower = test_user1 if book_copy % 2 else test_user2
-            status = 'm'
-            BookInstance.objects.create(
-                book=test_book,
+        book_copies = [
+            BookInstance(
+                book=cls.book,
                 imprint='Test, 2016',
-                due_back=return_date,
-                borrower=the_borrower,
-                status=status)
+                due_back=now + datetime.timedelta(days=book_copy % 5),
+                borrower=test_user1 if book_copy % 2 else test_user2,
+                status='m')
+            for book_copy in range(number_of_book_copies)
+        ]
+        BookInstance.objects.bulk_create(book_copies, batch_size=number_of_book_copies)
 
     def test_redirect_if_not_logged_in(self):
-        response = self.client.get(reverse('my-borrowed'))
+        response = self.client.get(MY_BORROWED_URL)
         self.assertRedirects(response, '/accounts/login/?next=/catalog/mybooks/')
 
     def test_logged_in_uses_correct_template(self):
         login = self.client.login(username='testuser1', password='!q@w#e$r%t')
-        response = self.client.get(reverse('my-borrowed'))
+        response = self.client.get(MY_BORROWED_URL)
         self.assertEqual(str(response.context['user']), 'testuser1')
         self.assertEqual(response.status_code, 200)
         self.assertTemplateUsed(response, 'bookinstance_list_borrowed_user.html')
 
     def test_only_borrowed_books_in_list(self):
         login = self.client.login(username='testuser1', password='!q@w#e$r%t')
-        response = self.client.get(reverse('my-borrowed'))
-        self.assertEqual(str(response.context['user']), 'testuser1')
+        response = self.client.get(MY_BORROWED_URL)
+        ctx = response.context
+        self.assertEqual(str(ctx['user']), 'testuser1')
         self.assertEqual(response.status_code, 200)
-        self.assertTrue('bookinstance_list' in response.context)
-        self.assertEqual(len(response.context['bookinstance_list']), 0)
-        books = BookInstance.objects.all()[:10]
-        for book in books:
-            book.status = 'o'
-            book.save()
-        response = self.client.get(reverse('my-borrowed'))
-        self.assertEqual(str(response.context['user']), 'testuser1')
+        self.assertIn('bookinstance_list', ctx)
+        self.assertEqual(len(ctx['bookinstance_list']), 0)
+        book_ids = list(BookInstance.objects.values_list('pk', flat=True)[:10])
+        BookInstance.objects.filter(pk__in=book_ids).update(status='o')
+        response = self.client.get(MY_BORROWED_URL)
+        ctx = response.context
+        self.assertEqual(str(ctx['user']), 'testuser1')
         self.assertEqual(response.status_code, 200)
-        self.assertTrue('bookinstance_list' in response.context)
-        for bookitem in response.context['bookinstance_list']:
-            self.assertEqual(response.context['user'], bookitem.borrower)
+        self.assertIn('bookinstance_list', ctx)
+        user_pk = ctx['user'].pk
+        for bookitem in ctx['bookinstance_list']:
+            self.assertEqual(user_pk, bookitem.borrower_id)
             self.assertEqual('o', bookitem.status)
 
     def test_pages_ordered_by_due_date(self):
-        for book in BookInstance.objects.all():
-            book.status = 'o'
-            book.save()
+        BookInstance.objects.update(status='o')
         login = self.client.login(username='testuser1', password='!q@w#e$r%t')
-        response = self.client.get(reverse('my-borrowed'))
-        self.assertEqual(str(response.context['user']), 'testuser1')
+        response = self.client.get(MY_BORROWED_URL)
+        ctx = response.context
+        self.assertEqual(str(ctx['user']), 'testuser1')
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(len(response.context['bookinstance_list']), 10)
-        last_date = 0
-        for book in response.context['bookinstance_list']:
-            if last_date == 0:
-                last_date = book.due_back
-            else:
-                self.assertTrue(last_date <= book.due_back)
-                last_date = book.due_back
-
-
-class RenewBookInstancesViewTest(TestCase):
-    def setUp(self):
-        test_user1 = User.objects.create_user(username='testuser1', password='!q@w#e$r%t')
-        test_user2 = User.objects.create_user(username='testuser2', password='!q@w#e$r%tQ')
-        test_user1.save()
-        permission = Permission.objects.get(name='Set book as returned')
-        test_user2.user_permissions.add(permission)
-        test_user2.save()
-        test_author = Author.objects.create(first_name='John', last_name='Smith', date_of_birth=datetime.date.today())
-        test_language = Language.objects.create(name='English')
-        test_book = Book.objects.create(
-            title='Test Book',
-            summary='My book summary',
-            isbn='asdfgf',
-            author=test_author,
-            language=test_language)
-        genre_objects_for_book = Genre.objects.all()
-        test_book.genre.set(genre_objects_for_book)
-        test_book.save()
-        return_date = datetime.date.today() + datetime.timedelta(days=5)
-        status = 'o'
-        self.bookinstance1 = BookInstance.objects.create(
-            book=test_book,
-            imprint='Test, 2016',
-            due_back=return_date,
-            borrower=test_user1,
-            status=status)
+        self.assertEqual(len(ctx['bookinstance_list']), 10)
+        due_dates = [book.due_back for book in ctx['bookinstance_list']]
+        self.assertEqual(due_dates, sorted(due_dates))
+
+
+@override_settings(PASSWORD_HASHERS=FAST_PASSWORD_HASHERS)
+class RenewBookInstancesViewTest(_CatalogFixtureMixin):
 
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.test_user1 = User.objects.create_user(username='testuser1', password='!q@w#e$r%t')
+        cls.test_user2 = User.objects.create_user(username='testuser2', password='!q@w#e$r%tQ')
+        cls.permission = Permission.objects.get(codename='can_mark_returned')
+        cls.test_user2.user_permissions.add(cls.permission)
+        librarian_client = Client()
+        librarian_client.force_login(cls.test_user2)
+        cls.librarian_session_key = librarian_client.cookies[settings.SESSION_COOKIE_NAME].value
         return_date = datetime.date.today() + datetime.timedelta(days=5)
-        status = 'o'
-        self.bookinstance2 = BookInstance.objects.create(
-            book=test_book,
-            imprint='Test, 2016',
-            due_back=return_date,
-            borrower=test_user2,
-            status=status)
+        cls.bookinstance1, cls.bookinstance2 = BookInstance.objects.bulk_create([
+            BookInstance(
+                book=cls.book,
+                imprint='Test, 2016',
+                due_back=return_date,
+                borrower=cls.test_user1,
+                status='o'),
+            BookInstance(
+                book=cls.book,
+                imprint='Test, 2016',
+                due_back=return_date,
+                borrower=cls.test_user2,
+                status='o'),
+        ])
+
+    def _login_as_librarian(self):
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = self.librarian_session_key
 
     def test_redirect_if_not_logged_in(self):
-        response = self.client.get(reverse('renew-book-librarian', kwargs={'pk': self.bookinstance1.pk}))
+        response = self.client.get(_renew_url(self.bookinstance1.pk))
         self.assertEqual(response.status_code, 302)
         self.assertTrue(response.url.startswith('/accounts/login/'))
 
     def test_redirect_if_logged_in_but_not_correct_permission(self):
-        login = self.client.login(username='testuser1', password='!q@w#e$r%t')
-        response = self.client.get(reverse('renew-book-librarian', kwargs={'pk': self.bookinstance1.pk}))
+        self.client.force_login(self.test_user1)
+        response = self.client.get(_renew_url(self.bookinstance1.pk))
         self.assertEqual(response.status_code, 302)
 
     def test_logged_in_with_permission_borrowed_book(self):
-        login = self.client.login(username='testuser2', password='!q@w#e$r%tQ')
-        response = self.client.get(reverse('renew-book-librarian', kwargs={'pk': self.bookinstance2.pk}))
+        self._login_as_librarian()
+        response = self.client.get(_renew_url(self.bookinstance2.pk))
         self.assertEqual(response.status_code, 200)
 
     def test_logged_in_with_permission_another_users_borrowed_book(self):
-        login = self.client.login(username='testuser2', password='!q@w#e$r%tQ')
-        response = self.client.get(reverse('renew-book-librarian', kwargs={'pk': self.bookinstance1.pk}))
+        self._login_as_librarian()
+        response = self.client.get(_renew_url(self.bookinstance1.pk))
         self.assertEqual(response.status_code, 200)
 
     def test_http404_for_invalid_book_if_logged_in(self):
-        test_uuid = uuid.uuid4()
-        login = self.client.login(username='testuser2', password='!q@w#e$r%tQ')
-        response = self.client.get(reverse('renew-book-librarian', kwargs={'pk': test_uuid}))
+        self._login_as_librarian()
+        response = self.client.get(_renew_url(INVALID_BOOK_INSTANCE_PK))
         self.assertEqual(response.status_code, 404)
 
     def test_uses_correct_template(self):
-        login = self.client.login(username='testuser2', password='!q@w#e$r%tQ')
-        response = self.client.get(reverse('renew-book-librarian', kwargs={'pk': self.bookinstance1.pk}))
+        self._login_as_librarian()
+        response = self.client.get(_renew_url(self.bookinstance1.pk))
         self.assertEqual(response.status_code, 200)
         self.assertTemplateUsed(response, 'catalog/book_renew_librarian.html')
 
     def test_form_renewal_date_initially_has_date_three_weeks_in_future(self):
-        login = self.client.login(username='testuser2', password='!q@w#e$r%tQ')
-        response = self.client.get(reverse('renew-book-librarian', kwargs={'pk': self.bookinstance1.pk}))
+        self._login_as_librarian()
+        response = self.client.get(_renew_url(self.bookinstance1.pk))
         self.assertEqual(response.status_code, 200)
         test_date = datetime.date.today() + datetime.timedelta(weeks=3)
         self.assertEqual(response.context['form'].initial['renewal_date'], test_date)
 
     def test_redirects_to_all_borrowed_book_list_on_success(self):
-        login = self.client.login(username='testuser2', password='!q@w#e$r%tQ')
+        self._login_as_librarian()
         valid_date = datetime.date.today() + datetime.timedelta(weeks=2)
-        response = self.client.post(reverse('renew-book-librarian', kwargs={'pk': self.bookinstance1.pk}),
+        response = self.client.post(_renew_url(self.bookinstance1.pk),
                                     {'renewal_date': valid_date})
-        self.assertRedirects(response, reverse('all-borrowed'))
+        self.assertRedirects(response, ALL_BORROWED_URL)
 
     def test_form_invalid_renewal_date_past(self):
-        login = self.client.login(username='testuser2', password='!q@w#e$r%tQ')
+        self._login_as_librarian()
         date_in_past = datetime.date.today() - datetime.timedelta(weeks=1)
-        response = self.client.post(reverse('renew-book-librarian', kwargs={'pk': self.bookinstance1.pk}),
+        response = self.client.post(_renew_url(self.bookinstance1.pk),
                                     {'renewal_date': date_in_past}, follow=True)
         self.assertEqual(response.status_code, 200)
         self.assertFormError(response, 'form', 'renewal_date', 'Invalid date - renewal in past')
 
     def test_form_invalid_renewal_date_future(self):
-        login = self.client.login(username='testuser2', password='!q@w#e$r%tQ')
+        self._login_as_librarian()
         date_in_past = datetime.date.today() + datetime.timedelta(weeks=5)
-        response = self.client.post(reverse('renew-book-librarian', kwargs={'pk': self.bookinstance1.pk}),
+        response = self.client.post(_renew_url(self.bookinstance1.pk),
                                     {'renewal_date': date_in_past}, follow=True)
         self.assertEqual(response.status_code, 200)
         self.assertFormError(response, 'form', 'renewal_date', 'Invalid date - renewal more than 4 weeks ahead')
 
 
+@override_settings(PASSWORD_HASHERS=FAST_PASSWORD_HASHERS)
 class AuthorCreateTest(TestCase):
-    def setUp(self):
+
+    @classmethod
+    def setUpTestData(cls):
         test_user1 = User.objects.create_user(username='testuser1', password='!q@w#e$r%t')
         test_user2 = User.objects.create_user(username='testuser2', password='!q@w#e$r%tQ')
-        test_user1.save()
-        permission = Permission.objects.get(name='Set book as returned')
-        test_user2.user_permissions.add(permission)
-        test_user2.save()
+        cls.permission = Permission.objects.get(codename='can_mark_returned')
+        test_user2.user_permissions.add(cls.permission)
 
     def test_permission_denied(self):
         login = self.client.login(username='testuser1', password='!q@w#e$r%t')
-        response = self.client.get(reverse('author-create'))
+        response = self.client.get(AUTHOR_CREATE_URL)
         self.assertEqual(response.status_code, 403)
 
     def test_permission_granted(self):
         login = self.client.login(username='testuser2', password='!q@w#e$r%tQ')
-        response = self.client.get(reverse('author-create'))
+        response = self.client.get(AUTHOR_CREATE_URL)
         self.assertEqual(response.status_code, 200)
 
     def test_valid_template(self):
         login = self.client.login(username='testuser2', password='!q@w#e$r%tQ')
-        response = self.client.get(reverse('author-create'))
+        response = self.client.get(AUTHOR_CREATE_URL)
         self.assertTemplateUsed(response, 'catalog/author_form.html')
\ No newline at end of file
@@ -0,0 +1,19 @@
+"""
+Django settings for running the locallibrary test suite.
+
+Usage: python manage.py test --settings=locallibrary.test_settings
+
+Test classes build their fixtures in setUpTestData and do not depend on
+specific primary keys, so the suite can also run with --parallel.
+"""
+
+from locallibrary.settings import *  # noqa: F401,F403
+
+# Always test against an in-memory SQLite database, even when DATABASE_URL
+# points the regular settings at PostgreSQL, so no schema is written to disk.
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+    }
+}